@@ -1,8 +1,70 @@
+import re
 import sys
 import hashlib
+import functools
+from typing import Callable, TextIO
 
 # === Utils ================================================================== #
 
+_WS_RE = re.compile(r"\s*")
+_IDENT_RE = re.compile(r"\w*")
+_TYPE_STOP_RE = re.compile(r"[,()\[\]{}]")
+
+
+@functools.cache
+def _separatorRe(sep: str) -> re.Pattern[str]:
+    return re.compile(r"\s*" + re.escape(sep) + r"\s*")
+
+
+@functools.cache
+def _keywordRe(keyword: str) -> re.Pattern[str]:
+    return re.compile(r"\s*" + re.escape(keyword) + r"(?!\w)\s*")
+
+
+@functools.cache
+def _stringBodyRe(quote: str) -> re.Pattern[str]:
+    q = re.escape(quote)
+    return re.compile(rf"(?:[^\\{q}]+|\\.)*", re.DOTALL)
+
+
+def _pySkipIdent(src: str, off: int) -> int:
+    m = _IDENT_RE.match(src, off)
+    assert m is not None
+    return m.end()
+
+
+def _pySkipType(src: str, off: int) -> int:
+    start = off
+    depth = 0
+    while True:
+        m = _TYPE_STOP_RE.search(src, off)
+        if m is None:
+            off = len(src)
+            break
+        c = m.group()
+        if depth == 0 and c in ",)":
+            off = m.start()
+            break
+        if c in "([{":
+            depth += 1
+        elif c != "," and depth > 0:
+            depth -= 1
+        off = m.end()
+    return start + len(src[start:off].rstrip())
+
+
+_skipIdent: Callable[[str, int], int]
+_skipType: Callable[[str, int], int]
+
+try:
+    from . import _scan
+except ImportError:
+    _skipIdent = _pySkipIdent
+    _skipType = _pySkipType
+else:
+    _skipIdent = _scan.skipIdent
+    _skipType = _scan.skipType
+
 
 class ScanError(Exception):
     where: int
@@ -14,6 +76,8 @@ class ScanError(Exception):
 
 
 class Tok:
+    __slots__ = ("start", "end", "text")
+
     start: int
     end: int
     text: str
@@ -28,13 +92,11 @@ class Scan:
     _src: str
     _start: int
     _off: int
-    _save: list[int]
 
     def __init__(self, src: str, off: int = 0):
         self._src = src
         self._off = 0
         self._start = 0
-        self._save = []
 
     def curr(self) -> str:
         if self.eof():
@@ -62,78 +124,73 @@ class Scan:
         return self._off >= len(self._src)
 
     def skipStr(self, s: str) -> bool:
-        if self._src[self._off :].startswith(s):
+        if self._src.startswith(s, self._off):
             self._off += len(s)
             return True
         return False
 
     def isStr(self, s: str) -> bool:
-        self.save()
-        if self.skipStr(s):
-            self.restore()
-            return True
-        self.restore()
-        return False
-
-    def save(self) -> None:
-        self._save.append(self._off)
-
-    def restore(self) -> None:
-        self._off = self._save.pop()
+        return self._src.startswith(s, self._off)
 
     def begin(self) -> None:
         self._start = self._off
 
     def end(self) -> Tok:
-        return Tok(self._start, self._off, self._src[self._start : self._off])
+        text = sys.intern(self._src[self._start : self._off])
+        return Tok(self._start, self._off, text)
 
     def skipWhitespace(self) -> bool:
-        result = False
-        while not self.eof() and self.curr().isspace():
-            self.next()
-            result = True
-        return result
+        start = self._off
+        m = _WS_RE.match(self._src, start)
+        assert m is not None
+        self._off = m.end()
+        return self._off != start
+
+    def skipIdent(self) -> bool:
+        start = self._off
+        self._off = _skipIdent(self._src, start)
+        return self._off != start
+
+    def skipType(self) -> bool:
+        start = self._off
+        self._off = _skipType(self._src, start)
+        return self._off != start
+
+    def skipStringBody(self, quotes: str, raw: bool) -> None:
+        if raw:
+            end = self._src.find(quotes, self._off)
+            self._off = len(self._src) if end < 0 else end
+            return
+        m = _stringBodyRe(quotes).match(self._src, self._off)
+        assert m is not None
+        self._off = m.end()
+        if self.curr() == "\\":
+            self._off = len(self._src)
+            self.error("Expected escape sequence")
 
     def skipSeparator(self, sep: str) -> bool:
-        self.save()
-        self.skipWhitespace()
-        if self.skipStr(sep):
-            self.skipWhitespace()
-            return True
-        self.restore()
-        return False
+        m = _separatorRe(sep).match(self._src, self._off)
+        if m is None:
+            return False
+        self._off = m.end()
+        return True
 
     def isSeparator(self, sep: str) -> bool:
-        self.save()
-        self.skipWhitespace()
-        if self.skipStr(sep):
-            self.skipWhitespace()
-            self.restore()
-            return True
-        self.restore()
-        return False
+        return _separatorRe(sep).match(self._src, self._off) is not None
 
     def expectSeparator(self, sep: str) -> None:
         if not self.skipSeparator(sep):
             self.error(f"Expected separator '{sep}'")
 
     def skipKeyword(self, keyword: str) -> bool:
-        self.save()
-        self.skipWhitespace()
-        if self.skipStr(keyword) and not self.curr().isalnum():
-            self.skipWhitespace()
-            return True
-        self.restore()
-        return False
+        m = _keywordRe(keyword).match(self._src, self._off)
+        if m is None:
+            return False
+        self._off = m.end()
+        return True
 
     def isKeyword(self, keyword: str) -> bool:
-        self.save()
-        self.skipWhitespace()
-        if self.skipStr(keyword) and not self.curr().isalnum():
-            self.restore()
-            return True
-        self.restore()
-        return False
+        return _keywordRe(keyword).match(self._src, self._off) is not None
 
     def expectKeyword(self, keyword: str) -> None:
         if not self.skipKeyword(keyword):
@@ -147,12 +204,18 @@ class Scan:
 
 
 class Node:
-    pass
+    __slots__ = ()
 
 
 class Func(Node):
+    __slots__ = ("name", "uid", "args", "declArgs", "typeArgs", "fwdArgs", "res")
+
     name: str
+    uid: str
     args: list[tuple[str, str]]
+    declArgs: str
+    typeArgs: str
+    fwdArgs: str
     res: str
 
     def id(self):
@@ -160,7 +223,10 @@ class Func(Node):
 
 
 class Iface(Node):
+    __slots__ = ("name", "uid", "funcs")
+
     name: str
+    uid: str
     funcs: dict[str, Func]
 
     def id(self):
@@ -168,6 +234,8 @@ class Iface(Node):
 
 
 class Module(Node):
+    __slots__ = ("name", "includes", "ifaces")
+
     name: str
     includes: list[str]
     ifaces: dict[str, Iface]
@@ -177,27 +245,7 @@ class Module(Node):
 
 
 def nextIdent(s: Scan):
-    while s.curr().isalnum() or s.curr() == "_":
-        s.next()
-
-
-BRAKETS = {
-    "{": "}",
-    "[": "]",
-    "(": ")",
-}
-
-
-def nextBrackets(s: Scan, open: str, close: str) -> None:
-    """
-    Exemple:
-    [foo]
-    [foo, bar]
-    [foo, bar, baz]
-    """
-    s.expectSeparator(open)
-    while not s.eof() and not s.skipSeparator(close):
-        s.next()
+    s.skipIdent()
 
 
 def skipNamespaceSep(s: Scan):
@@ -214,12 +262,11 @@ def parseIdent(s: Scan) -> Tok:
     foo::bar<T>
     """
     s.skipWhitespace()
-    if not s.curr().isalpha():
+    if not (s.curr().isalpha() or s.curr() == "_"):
         s.error("Expected identifier")
         assert False  # unreachable
     s.begin()
-    while s.curr().isalnum() or s.curr() == "_":
-        s.next()
+    s.skipIdent()
     ident = s.end()
     s.skipWhitespace()
     return ident
@@ -248,11 +295,7 @@ def parseType(s: Scan) -> Tok:
     : <type>)
     """
     s.begin()
-    while not s.eof() and not s.isSeparator(",") and not s.isSeparator(")"):
-        if s.curr() in BRAKETS:
-            nextBrackets(s, s.curr(), BRAKETS[s.curr()])
-        else:
-            s.next()
+    s.skipType()
     return s.end()
 
 
@@ -287,13 +330,7 @@ def parseString(s: Scan) -> Tok:
     """
     quotes, raw = parseQuotes(s)
     s.begin()
-    while not s.eof() and not s.isStr(quotes):
-        if s.curr() == "\\" and not raw:
-            s.next()
-            if s.eof():
-                s.error("Expected escape sequence")
-                assert False  # unreachable
-        s.next()
+    s.skipStringBody(quotes, raw)
     t = s.end()
     s.skipStr(quotes)
     return t
@@ -302,6 +339,7 @@ def parseString(s: Scan) -> Tok:
 def parseFunc(s: Scan) -> Func:
     f = Func()
     f.name = parseIdent(s).text
+    f.uid = f.id()
     s.expectSeparator("(")
     f.args = []
     while not s.skipSeparator(")"):
@@ -310,6 +348,9 @@ def parseFunc(s: Scan) -> Func:
         argType = parseType(s).text
         f.args.append((argType, argName))
         s.skipSeparator(",")
+    f.declArgs = ", ".join(f"{t} {n}" for t, n in f.args)
+    f.typeArgs = ", ".join(t for t, _ in f.args)
+    f.fwdArgs = ", ".join(f"std::move({n})" for _, n in f.args)
 
     s.expectSeparator("->")
     f.res = parseType(s).text
@@ -319,6 +360,7 @@ def parseFunc(s: Scan) -> Func:
 def parseIface(s: Scan) -> Iface:
     iface = Iface()
     iface.name = parseIdent(s).text
+    iface.uid = iface.id()
     s.expectSeparator("{")
     iface.funcs = {}
     while not s.skipSeparator("}"):
@@ -348,22 +390,28 @@ def parseModule(s: Scan) -> Module:
 # --- Header ----------------------------------------------------------------- #
 
 
-def genVirtualFunc(f: Func) -> str:
-    return f"""
-    static constexpr auto {f.name}_UID = 0x{f.id()};
-    virtual {f.res} {f.name}({', '.join([f'{t} {n}' for t, n in f.args])}) = 0;
+def genVirtualFunc(f: Func, out: TextIO) -> None:
+    out.write(
+        f"""
+    static constexpr auto {f.name}_UID = 0x{f.uid};
+    virtual {f.res} {f.name}({f.declArgs}) = 0;
     """
+    )
 
 
-def genVirtualFuncs(iface: Iface) -> str:
-    return "\n".join([genVirtualFunc(f) for f in iface.funcs.values()])
+def genVirtualFuncs(iface: Iface, out: TextIO) -> None:
+    for i, f in enumerate(iface.funcs.values()):
+        if i:
+            out.write("\n")
+        genVirtualFunc(f, out)
 
 
-def genVirtualClass(module: Module, iface: Iface) -> str:
-    return f"""
+def genVirtualClass(module: Module, iface: Iface, out: TextIO) -> None:
+    out.write(
+        f"""
 struct I{iface.name}
 {{
-    static constexpr auto _UID = 0x{iface.id()};
+    static constexpr auto _UID = 0x{iface.uid};
     static constexpr auto _NAME = "{module.name}::{iface.name}";
 
     template <typename T>
@@ -372,34 +420,46 @@ struct I{iface.name}
     auto _dispatch(auto);
 
     virtual ~I{iface.name}() = default;
-    {genVirtualFuncs(iface)}
-}};
+    """
+    )
+    genVirtualFuncs(iface, out)
+    out.write(
+        """
+};
 """
+    )
 
 
-def genVirtualIfaces(module: Module, ifaces: dict[str, Iface]) -> str:
-    return "\n".join([genVirtualClass(module, iface) for iface in ifaces.values()])
+def genVirtualIfaces(module: Module, ifaces: dict[str, Iface], out: TextIO) -> None:
+    for i, iface in enumerate(ifaces.values()):
+        if i:
+            out.write("\n")
+        genVirtualClass(module, iface, out)
 
 
-def genClientFunc(iface: Iface, f: Func) -> str:
-    clientFuncArgs = ", ".join([f"{t} {n}" for t, n in f.args])
-    invokeTmpArgs = ", ".join([f.res] + list([t for t, _ in f.args]))
-    invokeFncArgs = ", ".join([f"std::move({n})" for _, n in f.args])
+def genClientFunc(iface: Iface, f: Func, out: TextIO) -> None:
+    invokeTmpArgs = f"{f.res}, {f.typeArgs}" if f.args else f.res
 
-    return f"""
-{f.res} {f.name}({clientFuncArgs})
+    out.write(
+        f"""
+{f.res} {f.name}({f.declArgs})
 {{
-    return _t.template invoke<I{iface.name}, {f.name}_UID,  {invokeTmpArgs}>({invokeFncArgs});
+    return _t.template invoke<I{iface.name}, {f.name}_UID,  {invokeTmpArgs}>({f.fwdArgs});
 }}
 """
+    )
 
 
-def genClientFuncs(iface: Iface) -> str:
-    return "\n".join([genClientFunc(iface, f) for f in iface.funcs.values()])
+def genClientFuncs(iface: Iface, out: TextIO) -> None:
+    for i, f in enumerate(iface.funcs.values()):
+        if i:
+            out.write("\n")
+        genClientFunc(iface, f, out)
 
 
-def genClientClass(iface: Iface) -> str:
-    return f"""
+def genClientClass(iface: Iface, out: TextIO) -> None:
+    out.write(
+        f"""
 template <typename T>
 struct I{iface.name}::_Client : public I{iface.name}
 {{
@@ -407,47 +467,72 @@ struct I{iface.name}::_Client : public I{iface.name}
 
     _Client(T t) : _t{{t}} {{}}
 
-    {genClientFuncs(iface)}
-}};
+    """
+    )
+    genClientFuncs(iface, out)
+    out.write(
+        """
+};
 """
+    )
 
 
-def genClientIfaces(ifaces: dict[str, Iface]) -> str:
-    return "\n".join([genClientClass(iface) for iface in ifaces.values()])
+def genClientIfaces(ifaces: dict[str, Iface], out: TextIO) -> None:
+    for i, iface in enumerate(ifaces.values()):
+        if i:
+            out.write("\n")
+        genClientClass(iface, out)
 
 
-def genDispatchCase(iface: Iface, f: Func) -> str:
-    return f"""
+def genDispatchCase(iface: Iface, f: Func, out: TextIO) -> None:
+    out.write(
+        f"""
 case {f.name}_UID:
-    return o.template call<{', '.join([f'{t}' for t, _ in f.args])}>([&]<typename... Args>(Args &&... args) {{
+    return o.template call<{f.typeArgs}>([&]<typename... Args>(Args &&... args) {{
         return {f.name}(std::forward<Args>(args)...);
     }});
 """
+    )
 
 
-def genDispatchCases(iface: Iface) -> str:
-    return "\n".join([genDispatchCase(iface, f) for f in iface.funcs.values()])
+def genDispatchCases(iface: Iface, out: TextIO) -> None:
+    for i, f in enumerate(iface.funcs.values()):
+        if i:
+            out.write("\n")
+        genDispatchCase(iface, f, out)
 
 
-def genDispatchFunc(iface: Iface) -> str:
-    return f"""
+def genDispatchFunc(iface: Iface, out: TextIO) -> None:
+    out.write(
+        f"""
 auto I{iface.name}::_dispatch(auto o)
 {{
     switch (o.mid())
     {{
-        {genDispatchCases(iface)}
+        """
+    )
+    genDispatchCases(iface, out)
+    out.write(
+        """
         default: return o.error();
-    }}
-}}
+    }
+}
 """
+    )
 
 
-def genDispatchFuncs(ifaces: dict[str, Iface]) -> str:
-    return "\n".join([genDispatchFunc(iface) for iface in ifaces.values()])
+def genDispatchFuncs(ifaces: dict[str, Iface], out: TextIO) -> None:
+    for i, iface in enumerate(ifaces.values()):
+        if i:
+            out.write("\n")
+        genDispatchFunc(iface, out)
 
 
-def genIncludes(includes: list[str]) -> str:
-    return "\n".join([f"#include <{i}>" for i in includes])
+def genIncludes(includes: list[str], out: TextIO) -> None:
+    for i, include in enumerate(includes):
+        if i:
+            out.write("\n")
+        out.write(f"#include <{include}>")
 
 
 # === Main =================================================================== #
@@ -459,17 +544,19 @@ def main() -> int:
         return 0
 
     with open(sys.argv[1], "r") as inFile:
-        with open(sys.argv[2], "w") as outFile:
-            s = Scan(inFile.read())
-            module = parseModule(s)
-            print("#pragma once", file=outFile)
-            print(f"// Generated by chatty from {sys.argv[1]}", file=outFile)
-            print("// DO NOT EDIT", file=outFile)
-            print(genIncludes(module.includes), file=outFile)
-            print(f"namespace {module.name} {{", file=outFile)
-            print(genVirtualIfaces(module, module.ifaces), file=outFile)
-            print(genClientIfaces(module.ifaces), file=outFile)
-            print(genDispatchFuncs(module.ifaces), file=outFile)
-            print("} // namespace", module.name, file=outFile)
+        s = Scan(inFile.read())
+    module = parseModule(s)
+    with open(sys.argv[2], "w") as outFile:
+        outFile.write("#pragma once\n")
+        outFile.write(f"// Generated by chatty from {sys.argv[1]}\n")
+        outFile.write("// DO NOT EDIT\n")
+        genIncludes(module.includes, outFile)
+        outFile.write(f"\nnamespace {module.name} {{\n")
+        genVirtualIfaces(module, module.ifaces, outFile)
+        outFile.write("\n")
+        genClientIfaces(module.ifaces, outFile)
+        outFile.write("\n")
+        genDispatchFuncs(module.ifaces, outFile)
+        outFile.write(f"\n}} // namespace {module.name}\n")
 
     return 0
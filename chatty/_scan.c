@@ -0,0 +1,93 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+/* C implementations of the hot scanning loops of chatty.Scan.
+ *
+ * Each function takes the source string and a start offset and returns the
+ * offset where scanning stopped. They mirror _pySkipIdent and _pySkipType in
+ * chatty/__init__.py, which are used when this module is not built. */
+
+/* Same set as the \w regex class: str.isalnum() plus '_'. */
+static int isIdent(Py_UCS4 c)
+{
+    return Py_UNICODE_ISALNUM(c) || c == '_';
+}
+
+static int parseArgs(PyObject *args, PyObject **src, Py_ssize_t *off)
+{
+    if (!PyArg_ParseTuple(args, "Un", src, off))
+        return 0;
+    if (*off < 0)
+        *off = 0;
+    if (*off > PyUnicode_GET_LENGTH(*src))
+        *off = PyUnicode_GET_LENGTH(*src);
+    return 1;
+}
+
+static PyObject *skipIdent(PyObject *self, PyObject *args)
+{
+    PyObject *src;
+    Py_ssize_t off;
+    if (!parseArgs(args, &src, &off))
+        return NULL;
+
+    int kind = PyUnicode_KIND(src);
+    const void *data = PyUnicode_DATA(src);
+    Py_ssize_t len = PyUnicode_GET_LENGTH(src);
+
+    while (off < len && isIdent(PyUnicode_READ(kind, data, off)))
+        off++;
+
+    return PyLong_FromSsize_t(off);
+}
+
+static PyObject *skipType(PyObject *self, PyObject *args)
+{
+    PyObject *src;
+    Py_ssize_t off;
+    if (!parseArgs(args, &src, &off))
+        return NULL;
+
+    int kind = PyUnicode_KIND(src);
+    const void *data = PyUnicode_DATA(src);
+    Py_ssize_t len = PyUnicode_GET_LENGTH(src);
+    Py_ssize_t start = off;
+    Py_ssize_t depth = 0;
+
+    for (; off < len; off++)
+    {
+        Py_UCS4 c = PyUnicode_READ(kind, data, off);
+        if (depth == 0 && (c == ',' || c == ')'))
+            break;
+        if (c == '(' || c == '[' || c == '{')
+            depth++;
+        else if ((c == ')' || c == ']' || c == '}') && depth > 0)
+            depth--;
+    }
+
+    while (off > start && Py_UNICODE_ISSPACE(PyUnicode_READ(kind, data, off - 1)))
+        off--;
+
+    return PyLong_FromSsize_t(off);
+}
+
+static PyMethodDef scanMethods[] = {
+    {"skipIdent", skipIdent, METH_VARARGS,
+     "Return the offset past the identifier characters starting at off."},
+    {"skipType", skipType, METH_VARARGS,
+     "Return the offset of the end of the type starting at off."},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef scanModule = {
+    PyModuleDef_HEAD_INIT,
+    "chatty._scan",
+    "C implementations of the chatty scanner hot loops.",
+    -1,
+    scanMethods,
+};
+
+PyMODINIT_FUNC PyInit__scan(void)
+{
+    return PyModule_Create(&scanModule);
+}
@@ -0,0 +1,2 @@
+def skipIdent(src: str, off: int, /) -> int: ...
+def skipType(src: str, off: int, /) -> int: ...
@@ -0,0 +1,32 @@
+import os
+
+from setuptools import Extension, setup
+
+# The C scanner is optional: if it fails to build, chatty falls back to the
+# pure Python implementation of the same loops. Set CHATTY_PURE=1 to leave it
+# out entirely and get a pure py3-none-any wheel.
+
+extModules = []
+
+if os.environ.get("CHATTY_PURE", "0") in ("", "0"):
+    extModules.append(
+        Extension("chatty._scan", ["chatty/_scan.c"], optional=True),
+    )
+
+# Compiling chatty with Cython is opt-in: set CHATTY_CYTHON=1 to build the
+# module as a C extension. Cython is not a build requirement, so this needs
+# `pip install --no-build-isolation` with Cython already installed. Without
+# it chatty is installed as plain Python.
+
+if os.environ.get("CHATTY_CYTHON", "0") not in ("", "0"):
+    try:
+        from Cython.Build import cythonize
+
+        extModules += cythonize(
+            ["chatty/__init__.py"],
+            compiler_directives={"language_level": 3},
+        )
+    except ImportError:
+        print("CHATTY_CYTHON is set but Cython is not installed, skipping")
+
+setup(ext_modules=extModules)
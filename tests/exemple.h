@@ -0,0 +1,55 @@
+#pragma once
+// Generated by chatty from exemples/exemple.chat
+// DO NOT EDIT
+#include <karm-math/vec.h>
+namespace hideo {
+
+struct ICompositor
+{
+    static constexpr auto _UID = 0x9763fd6ae0868ca0;
+    static constexpr auto _NAME = "hideo::Compositor";
+
+    template <typename T>
+    struct _Client;
+
+    auto _dispatch(auto);
+
+    virtual ~ICompositor() = default;
+    
+    static constexpr auto createWindow_UID = 0x7110f2964d70557a;
+    virtual Res<Window> createWindow(Vec2f size) = 0;
+    
+};
+
+
+template <typename T>
+struct ICompositor::_Client : public ICompositor
+{
+    T _t;
+
+    _Client(T t) : _t{t} {}
+
+    
+Res<Window> createWindow(Vec2f size)
+{
+    return _t.template invoke<ICompositor, createWindow_UID,  Res<Window>, Vec2f>(std::move(size));
+}
+
+};
+
+
+auto ICompositor::_dispatch(auto o)
+{
+    switch (o.mid())
+    {
+        
+case createWindow_UID:
+    return o.template call<Vec2f>([&]<typename... Args>(Args &&... args) {
+        return createWindow(std::forward<Args>(args)...);
+    });
+
+        default: return o.error();
+    }
+}
+
+} // namespace hideo
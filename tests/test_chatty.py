@@ -0,0 +1,36 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+import chatty
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_version(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["chatty", "--version"])
+    assert chatty.main() == 0
+    assert capsys.readouterr().out == "0.1.0-dev\n"
+
+
+def test_exemple(monkeypatch, tmp_path):
+    # exemple.h was generated by the original implementation; the output
+    # must stay byte-for-byte identical.
+    out = tmp_path / "exemple.h"
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(sys, "argv", ["chatty", "exemples/exemple.chat", str(out)])
+    assert chatty.main() == 0
+    assert out.read_bytes() == (ROOT / "tests" / "exemple.h").read_bytes()
+
+
+def test_scan_backends_agree():
+    scan = pytest.importorskip("chatty._scan")
+    rng = random.Random(0)
+    alphabet = "ab_1 ,()[]{}\t\né²"
+    for _ in range(20000):
+        src = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        off = rng.randint(0, len(src))
+        assert scan.skipIdent(src, off) == chatty._pySkipIdent(src, off)
+        assert scan.skipType(src, off) == chatty._pySkipType(src, off)